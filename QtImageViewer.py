@@ -5,16 +5,26 @@ Modified by Marco Crivaro Nicolini, 2023
 Licence at the end of the file.
 """
 
+from math import floor
 from pathlib import Path
 
+import numpy as np
+
 # from PySide6.QtCore import Qt, QRectF, QPoint, QPointF, Signal, QEvent, QSize
 # from PySide6.QtGui import QImage, QPixmap, QPainterPath, QMouseEvent, QPen
 # from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QFileDialog, QSizePolicy, QGraphicsItem, QGraphicsEllipseItem, QGraphicsRectItem, QGraphicsLineItem, QGraphicsPolygonItem, QGraphicsProxyWidget
 
-from PyQt6.QtCore import Qt, QRectF, QPoint, QPointF, pyqtSignal, QEvent, QSize
-from PyQt6.QtGui import QImage, QPixmap, QPainterPath, QMouseEvent, QPen
+from PyQt6.QtCore import Qt, QRectF, QPoint, QPointF, pyqtSignal, QEvent, QSize, QTimer
+from PyQt6.QtGui import QBrush, QImage, QPixmap, QPainter, QPainterPath, QMouseEvent, QPen
 from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QFileDialog, QSizePolicy, QGraphicsItem, QGraphicsEllipseItem, QGraphicsRectItem, QGraphicsLineItem, QGraphicsPolygonItem, QGraphicsProxyWidget
 
+# Modifier combo used to tag synthetic events (e.g. faking pan with left
+# button ScrollHandDrag). Built once; mouse events fire at polling rate.
+_DUMMY_MODS = (Qt.KeyboardModifier.ShiftModifier
+               | Qt.KeyboardModifier.ControlModifier
+               | Qt.KeyboardModifier.AltModifier
+               | Qt.KeyboardModifier.MetaModifier)
+
 
 class QtImageViewer(QGraphicsView):
     """ PyQt image viewer widget based on QGraphicsView with mouse zooming/panning and ROIs.
@@ -27,7 +37,7 @@ class QtImageViewer(QGraphicsView):
     Image:
     ------
     Use the setImage(im) method to set the image data in the viewer.
-            - im can be a QImage, QPixmap, or NumPy 2D array (the later requires the package qimage2ndarray).
+            - im can be a QImage, QPixmap, or NumPy 2D array.
             For display in the QGraphicsView the image will be converted to a QPixmap.
 
     Some useful image format conversion utilities:
@@ -122,9 +132,27 @@ class QtImageViewer(QGraphicsView):
         # Better quality pixmap scaling?
         # self.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
 
+        # The cosmetic 1px ROI pens don't need antialiasing, and skipping
+        # the per-item painter save/restore and AA dirty-rect inflation
+        # helps with many small items.
+        self.setOptimizationFlags(
+            QGraphicsView.OptimizationFlag.DontSavePainterState
+            | QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing)
+        self.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+
+        # One full repaint per frame beats computing minimal regions when
+        # many small items move during pan/zoom, and the cached
+        # background avoids re-rendering the pixmap each frame.
+        self.setViewportUpdateMode(
+            QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        self.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
+
         # Displayed image pixmap in the QGraphicsScene.
         self._image = None
 
+        # Backing array for the zero-copy QImage built in setImage.
+        self._imgBacking = None
+
         # Image aspect ratio mode.
         #   Qt.IgnoreAspectRatio: Scale image to fit viewport.
         #   Qt.KeepAspectRatio: Scale image to fit inside viewport, preserving aspect ratio.
@@ -165,9 +193,18 @@ class QtImageViewer(QGraphicsView):
 
         # Track mouse position. e.g., For displaying coordinates in a UI.
         self.setMouseTracking(True)
+        # Shared sentinel; treated as read-only downstream.
+        self._outOfImage = QPoint(-1, -1)
+        self.imagePos = self._outOfImage
+        # Coalesces pan repaints until the event queue drains.
+        self._updatePending = False
 
         # ROIs.
         self.ROIs = []
+        # Maps id(roi) -> index in self.ROIs for O(1) click dispatch.
+        self._roiIndexById = {}
+        # All ROIs hang off one group so clearROIs is a single scene op.
+        self._roiGroup = self._newROIGroup()
 
         # # For drawing ROIs.
         self.drawROI = None
@@ -215,23 +252,21 @@ class QtImageViewer(QGraphicsView):
             pixmap = image
         elif type(image) is QImage:
             pixmap = QPixmap.fromImage(image)
-        elif (np is not None) and (type(image) is np.ndarray):
-            if qimage2ndarray is not None:
-                qimage = qimage2ndarray.array2qimage(image, True)
-                pixmap = QPixmap.fromImage(qimage)
-            else:
-                image = image.astype(np.float32)
-                image -= image.min()
-                image /= image.max()
-                image *= 255
-                image[image > 255] = 255
-                image[image < 0] = 0
-                image = image.astype(np.uint8)
-                height, width = image.shape
-                bytes = image.tobytes()
-                qimage = QImage(bytes, width, height,
-                                QImage.Format.Format_Grayscale8)
-                pixmap = QPixmap.fromImage(qimage)
+        elif type(image) is np.ndarray:
+            # normaliza en una sola pasada en vez de restar/dividir/clippear
+            # por separado sobre todo el array
+            mn = float(image.min())
+            mx = float(image.max())
+            scale = 255.0 / (mx - mn) if mx > mn else 0.0
+            image = np.ascontiguousarray(
+                np.clip((image - mn) * scale, 0, 255).astype(np.uint8))
+            height, width = image.shape
+            # Passing the real stride lets QImage wrap the array without
+            # copying; keep the array alive while the view exists.
+            self._imgBacking = image
+            qimage = QImage(image.data, width, height,
+                            image.strides[0], QImage.Format.Format_Grayscale8)
+            pixmap = QPixmap.fromImage(qimage)
         else:
             raise RuntimeError(
                 "ImageViewer.setImage: Argument must be a QImage, QPixmap, or numpy.ndarray.")
@@ -294,9 +329,7 @@ class QtImageViewer(QGraphicsView):
         """ Start mouse pan or zoom mode.
         """
         # Ignore dummy events. e.g., Faking pan with left button ScrollHandDrag.
-        dummyModifiers = Qt.KeyboardModifier(Qt.KeyboardModifier.ShiftModifier | Qt.KeyboardModifier.ControlModifier
-                                             | Qt.KeyboardModifier.AltModifier | Qt.KeyboardModifier.MetaModifier)
-        if event.modifiers() == dummyModifiers:
+        if event.modifiers() == _DUMMY_MODS:
             QGraphicsView.mousePressEvent(self, event)
             event.accept()
             return
@@ -328,12 +361,8 @@ class QtImageViewer(QGraphicsView):
                 # ScrollHandDrag ONLY works with LeftButton, so fake it.
                 # Use a bunch of dummy modifiers to notify that event should NOT be handled as usual.
                 self.viewport().setCursor(Qt.CursorShape.ClosedHandCursor)
-                dummyModifiers = Qt.KeyboardModifier(Qt.KeyboardModifier.ShiftModifier
-                                                     | Qt.KeyboardModifier.ControlModifier
-                                                     | Qt.KeyboardModifier.AltModifier
-                                                     | Qt.KeyboardModifier.MetaModifier)
                 dummyEvent = QMouseEvent(QEvent.Type.MouseButtonPress, QPointF(event.pos()), Qt.MouseButton.LeftButton,
-                                         event.buttons(), dummyModifiers)
+                                         event.buttons(), _DUMMY_MODS)
                 self.mousePressEvent(dummyEvent)
             sceneViewport = self.mapToScene(
                 self.viewport().rect()).boundingRect().intersected(self.sceneRect())
@@ -356,9 +385,7 @@ class QtImageViewer(QGraphicsView):
         """ Stop mouse pan or zoom mode (apply zoom if valid).
         """
         # Ignore dummy events. e.g., Faking pan with left button ScrollHandDrag.
-        dummyModifiers = Qt.KeyboardModifier(Qt.KeyboardModifier.ShiftModifier | Qt.KeyboardModifier.ControlModifier
-                                             | Qt.KeyboardModifier.AltModifier | Qt.KeyboardModifier.MetaModifier)
-        if event.modifiers() == dummyModifiers:
+        if event.modifiers() == _DUMMY_MODS:
             QGraphicsView.mouseReleaseEvent(self, event)
             event.accept()
             return
@@ -407,12 +434,8 @@ class QtImageViewer(QGraphicsView):
                 # ScrollHandDrag ONLY works with LeftButton, so fake it.
                 # Use a bunch of dummy modifiers to notify that event should NOT be handled as usual.
                 self.viewport().setCursor(Qt.CursorShape.ArrowCursor)
-                dummyModifiers = Qt.KeyboardModifier(Qt.KeyboardModifier.ShiftModifier
-                                                     | Qt.KeyboardModifier.ControlModifier
-                                                     | Qt.KeyboardModifier.AltModifier
-                                                     | Qt.KeyboardModifier.MetaModifier)
                 dummyEvent = QMouseEvent(QEvent.Type.MouseButtonRelease, QPointF(event.pos()),
-                                         Qt.MouseButton.LeftButton, event.buttons(), dummyModifiers)
+                                         Qt.MouseButton.LeftButton, event.buttons(), _DUMMY_MODS)
                 self.mouseReleaseEvent(dummyEvent)
             self.setDragMode(QGraphicsView.DragMode.NoDrag)
             if len(self.zoomStack) > 0:
@@ -458,42 +481,51 @@ class QtImageViewer(QGraphicsView):
         if self.wheelZoomFactor is not None:
             if self.wheelZoomFactor == 1:
                 return
+            # Dispatch on wheel direction only; the two specialized
+            # helpers read sceneRect()/zoomStack once each.
             if event.angleDelta().y() > 0:
-                # zoom in
-                if len(self.zoomStack) == 0:
-                    self.zoomStack.append(self.sceneRect())
-                elif len(self.zoomStack) > 1:
-                    del self.zoomStack[:-1]
-                zoomRect = self.zoomStack[-1]
-                center = zoomRect.center()
-                zoomRect.setWidth(zoomRect.width() / self.wheelZoomFactor)
-                zoomRect.setHeight(zoomRect.height() / self.wheelZoomFactor)
-                zoomRect.moveCenter(center)
-                self.zoomStack[-1] = zoomRect.intersected(self.sceneRect())
-                self.updateViewer()
-                self.viewChanged.emit()
-            else:
-                # zoom out
-                if len(self.zoomStack) == 0:
-                    # Already fully zoomed out.
-                    return
-                if len(self.zoomStack) > 1:
-                    del self.zoomStack[:-1]
-                zoomRect = self.zoomStack[-1]
-                center = zoomRect.center()
-                zoomRect.setWidth(zoomRect.width() * self.wheelZoomFactor)
-                zoomRect.setHeight(zoomRect.height() * self.wheelZoomFactor)
-                zoomRect.moveCenter(center)
-                self.zoomStack[-1] = zoomRect.intersected(self.sceneRect())
-                if self.zoomStack[-1] == self.sceneRect():
-                    self.zoomStack = []
-                self.updateViewer()
-                self.viewChanged.emit()
+                self._wheelZoomIn()
+            elif not self._wheelZoomOut():
+                # Already fully zoomed out.
+                return
             event.accept()
             return
 
         QGraphicsView.wheelEvent(self, event)
 
+    def _wheelZoomIn(self):
+        sceneRect = self.sceneRect()
+        if len(self.zoomStack) == 0:
+            self.zoomStack.append(sceneRect)
+        elif len(self.zoomStack) > 1:
+            del self.zoomStack[:-1]
+        zoomRect = self.zoomStack[-1]
+        center = zoomRect.center()
+        zoomRect.setWidth(zoomRect.width() / self.wheelZoomFactor)
+        zoomRect.setHeight(zoomRect.height() / self.wheelZoomFactor)
+        zoomRect.moveCenter(center)
+        self.zoomStack[-1] = zoomRect.intersected(sceneRect)
+        self.updateViewer()
+        self.viewChanged.emit()
+
+    def _wheelZoomOut(self):
+        if len(self.zoomStack) == 0:
+            return False
+        if len(self.zoomStack) > 1:
+            del self.zoomStack[:-1]
+        sceneRect = self.sceneRect()
+        zoomRect = self.zoomStack[-1]
+        center = zoomRect.center()
+        zoomRect.setWidth(zoomRect.width() * self.wheelZoomFactor)
+        zoomRect.setHeight(zoomRect.height() * self.wheelZoomFactor)
+        zoomRect.moveCenter(center)
+        self.zoomStack[-1] = zoomRect.intersected(sceneRect)
+        if self.zoomStack[-1] == sceneRect:
+            self.zoomStack = []
+        self.updateViewer()
+        self.viewChanged.emit()
+        return True
+
         # try:
         #     if self.wheelZoomFactor == 1:
         #         return
@@ -570,94 +602,138 @@ class QtImageViewer(QGraphicsView):
         # return
 
     def mouseMoveEvent(self, event):
+        # One Python/C++ crossing for the whole event.
+        sceneRect = self.sceneRect()
         # Emit updated view during panning.
         if self._isPanning:
             QGraphicsView.mouseMoveEvent(self, event)
             if len(self.zoomStack) > 0:
                 sceneViewport = self.mapToScene(
-                    self.viewport().rect()).boundingRect().intersected(self.sceneRect())
+                    self.viewport().rect()).boundingRect().intersected(sceneRect)
                 delta = sceneViewport.topLeft() - self._scenePosition
                 self._scenePosition = sceneViewport.topLeft()
+                prev = QRectF(self.zoomStack[-1])
                 self.zoomStack[-1].translate(delta)
                 self.zoomStack[-1] = self.zoomStack[-1].intersected(
-                    self.sceneRect())
-                self.updateViewer()
-                self.viewChanged.emit()
+                    sceneRect)
+                # Sub-pixel deltas that leave the rect unchanged don't
+                # warrant a repaint nor notifying listeners.
+                if self.zoomStack[-1] != prev:
+                    # Defer the repaint so queued move events get
+                    # compressed into one updateViewer call.
+                    if not self._updatePending:
+                        self._updatePending = True
+                        QTimer.singleShot(0, self._deferredUpdateViewer)
+                    self.viewChanged.emit()
 
         scenePos = self.mapToScene(event.pos())
-        if self.sceneRect().contains(scenePos):
-            # Pixel index offset from pixel center.
-            x = int(round(scenePos.x() - 0.5))
-            y = int(round(scenePos.y() - 0.5))
-            self.imagePos = QPoint(x, y)
+        if sceneRect.contains(scenePos):
+            # Pixel index offset from pixel center; floor() is the same
+            # rounding as int(round(v - 0.5)) for in-rect coordinates.
+            imagePos = QPoint(floor(scenePos.x()), floor(scenePos.y()))
         else:
             # Invalid pixel position.
-            self.imagePos = QPoint(-1, -1)
-        self.mousePositionOnImageChanged.emit(self.imagePos)
+            imagePos = self._outOfImage
+        # Sub-pixel moves round to the same pixel, don't re-emit.
+        if imagePos != self.imagePos:
+            self.imagePos = imagePos
+            self.mousePositionOnImageChanged.emit(imagePos)
         QGraphicsView.mouseMoveEvent(self, event)
 
+    def _deferredUpdateViewer(self):
+        self._updatePending = False
+        self.updateViewer()
+
     def enterEvent(self, event):
         self.setCursor(Qt.CursorShape.ArrowCursor)
 
     def leaveEvent(self, event):
         self.setCursor(Qt.CursorShape.ArrowCursor)
 
+    def _newROIGroup(self):
+        # A bare container item, not a QGraphicsItemGroup: a group grabs
+        # its children's mouse events (and PyQt6 doesn't expose
+        # setHandlesChildEvents to turn that off), while an empty rect
+        # item paints nothing and lets clicks reach the individual ROIs.
+        group = QGraphicsRectItem()
+        self.scene.addItem(group)
+        return group
+
     def addROIs(self, rois):
         for roi in rois:
-            self.scene.addItem(roi)
+            roi.setParentItem(self._roiGroup)
+            self._roiIndexById[id(roi)] = len(self.ROIs)
             self.ROIs.append(roi)
 
     def deleteROIs(self, rois):
+        ids = {id(roi) for roi in rois}
         for roi in rois:
             self.scene.removeItem(roi)
-            self.ROIs.remove(roi)
-            del roi
+        # one-pass rebuild keeps ROI order and the index dict in sync
+        self.ROIs = [r for r in self.ROIs if id(r) not in ids]
+        self._roiIndexById = {id(r): i for i, r in enumerate(self.ROIs)}
 
     def clearROIs(self):
-        for roi in self.ROIs:
-            self.scene.removeItem(roi)
+        # Removing the group removes every ROI in one scene operation.
+        self.scene.removeItem(self._roiGroup)
+        self._roiGroup = self._newROIGroup()
         del self.ROIs[:]
+        self._roiIndexById.clear()
 
     def roiClicked(self, roi):
-        for i in range(len(self.ROIs)):
-            if roi is self.ROIs[i]:
-                self.roiSelected.emit(i)
-                break
+        i = self._roiIndexById.get(id(roi))
+        if i is not None:
+            self.roiSelected.emit(i)
 
     def setROIsAreMovable(self, tf):
-        if tf:
-            for roi in self.ROIs:
-                roi.setFlags(
-                    roi.flags() | QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
-        else:
-            for roi in self.ROIs:
-                roi.setFlags(roi.flags() & ~
-                             QGraphicsItem.GraphicsItemFlag.ItemIsMovable)
+        # setFlag toggles just the one flag, no flags() read-back needed
+        mflag = QGraphicsItem.GraphicsItemFlag.ItemIsMovable
+        for roi in self.ROIs:
+            roi.setFlag(mflag, tf)
 
     def addLine(self, x):
         line = LineROI(self)
         line.setLine(x, 0, x, self._image.height)
-        self.scene.addItem(line)
+        line.setParentItem(self._roiGroup)
+        self._roiIndexById[id(line)] = len(self.ROIs)
         self.ROIs.append(line)
 
     def addSpots(self, points, radius):
-        for point in points:
-            x, y = point
-            spot = EllipseROI(self)
-            spot.setRect(x - radius, y - radius, 2 * radius, 2 * radius)
-            self.scene.addItem(spot)
-            self.ROIs.append(spot)
+        # One lightweight item draws every spot from a single array,
+        # instead of a full QGraphicsEllipseItem per point.
+        layer = SpotsLayer(points, radius, self)
+        layer.setParentItem(self._roiGroup)
+        self._roiIndexById[id(layer)] = len(self.ROIs)
+        self.ROIs.append(layer)
 
 
-class EllipseROI(QGraphicsEllipseItem):
+# Pens shared by all ROI instances; built once instead of per item.
+_ROI_PEN = QPen(Qt.GlobalColor.yellow)
+_ROI_PEN.setCosmetic(True)
+_LINE_ROI_PEN = QPen(Qt.GlobalColor.yellow, 4)
+_NO_BRUSH = QBrush(Qt.BrushStyle.NoBrush)
+
+
+class _ClickableROI:
+    """ Shared construction and click forwarding for the ROI item types.
+    The concrete classes only pick the QGraphicsItem shape (and a pen).
+    """
+
+    _pen = _ROI_PEN
 
     def __init__(self, viewer):
-        QGraphicsItem.__init__(self)
+        # cooperative super() reaches the concrete shape item's
+        # constructor instead of the bare QGraphicsItem one
+        super().__init__()
         self._viewer = viewer
-        pen = QPen(Qt.GlobalColor.yellow)
-        pen.setCosmetic(True)
-        self.setPen(pen)
+        self.setPen(self._pen)
+        # explicit NoBrush keeps Qt's unfilled-shape fast path
+        # (QGraphicsLineItem has no brush)
+        if hasattr(self, 'setBrush'):
+            self.setBrush(_NO_BRUSH)
         self.setFlags(self.GraphicsItemFlag.ItemIsSelectable)
+        # Reuse the rasterized stroke across frames.
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
 
     def mousePressEvent(self, event):
         QGraphicsItem.mousePressEvent(self, event)
@@ -665,51 +741,64 @@ class EllipseROI(QGraphicsEllipseItem):
             self._viewer.roiClicked(self)
 
 
-class RectROI(QGraphicsRectItem):
+class EllipseROI(_ClickableROI, QGraphicsEllipseItem):
+    pass
 
-    def __init__(self, viewer):
-        QGraphicsItem.__init__(self)
-        self._viewer = viewer
-        pen = QPen(Qt.GlobalColor.yellow)
-        pen.setCosmetic(True)
-        self.setPen(pen)
-        self.setFlags(self.GraphicsItemFlag.ItemIsSelectable)
 
-    def mousePressEvent(self, event):
-        QGraphicsItem.mousePressEvent(self, event)
-        if event.button() == Qt.MouseButton.LeftButton:
-            self._viewer.roiClicked(self)
+class RectROI(_ClickableROI, QGraphicsRectItem):
+    pass
 
 
-class LineROI(QGraphicsLineItem):
+class LineROI(_ClickableROI, QGraphicsLineItem):
+    _pen = _LINE_ROI_PEN
 
-    def __init__(self, viewer):
-        QGraphicsItem.__init__(self)
-        self._viewer = viewer
-        pen = QPen(Qt.GlobalColor.yellow, 4)
-        self.setPen(pen)
-        self.setFlags(self.GraphicsItemFlag.ItemIsSelectable)
 
-    def mousePressEvent(self, event):
-        QGraphicsItem.mousePressEvent(self, event)
-        if event.button() == Qt.MouseButton.LeftButton:
-            self._viewer.roiClicked(self)
+class PolygonROI(_ClickableROI, QGraphicsPolygonItem):
+    pass
 
 
-class PolygonROI(QGraphicsPolygonItem):
+class SpotsLayer(QGraphicsItem):
+    """ Single item that draws many identical spots from a NumPy array.
+    Far lighter than one QGraphicsEllipseItem per point: the coordinates
+    live in one float32 array and painting is a single pass over the
+    exposed region.
+    """
 
-    def __init__(self, viewer):
-        QGraphicsItem.__init__(self)
+    def __init__(self, xy, radius, viewer):
+        super().__init__()
         self._viewer = viewer
-        pen = QPen(Qt.GlobalColor.yellow)
-        pen.setCosmetic(True)
-        self.setPen(pen)
-        self.setFlags(self.GraphicsItemFlag.ItemIsSelectable)
-
-    def mousePressEvent(self, event):
-        QGraphicsItem.mousePressEvent(self, event)
-        if event.button() == Qt.MouseButton.LeftButton:
-            self._viewer.roiClicked(self)
+        # Without this flag Qt passes the full boundingRect as
+        # exposedRect and the culling in paint() never filters anything.
+        self.setFlag(
+            QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        self._xy = np.asarray(xy, dtype=np.float32).reshape(-1, 2)
+        self._radius = float(radius)
+        r = self._radius
+        if len(self._xy):
+            xmin, ymin = self._xy.min(axis=0)
+            xmax, ymax = self._xy.max(axis=0)
+        else:
+            xmin = ymin = xmax = ymax = 0.0
+        self._bounds = QRectF(float(xmin) - r, float(ymin) - r,
+                              float(xmax - xmin) + 2 * r,
+                              float(ymax - ymin) + 2 * r)
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, painter, option, widget=None):
+        painter.setPen(_ROI_PEN)
+        painter.setBrush(_NO_BRUSH)
+        r = self._radius
+        # Only draw the spots intersecting the exposed region.
+        rect = option.exposedRect.adjusted(-r, -r, r, r)
+        x0, y0 = rect.left(), rect.top()
+        x1, y1 = rect.right(), rect.bottom()
+        xy = self._xy
+        visible = ((xy[:, 0] >= x0) & (xy[:, 0] <= x1)
+                   & (xy[:, 1] >= y0) & (xy[:, 1] <= y1))
+        for x, y in xy[visible].tolist():
+            painter.drawEllipse(QPointF(x, y), r, r)
 
 
 # Hay que hacer estas clases para poder tener drag & drop
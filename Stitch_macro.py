@@ -17,8 +17,10 @@ else:
     order = "Left & Down"
 print(salida)
 
+# "Save memory (but be slower)" hace la fusion por bloques en vez de
+# cargar todos los tiles en RAM, asi el consumo no escala con el panorama
 IJ.run("Grid/Collection stitching",
-       "type=[Grid: row-by-row] order=["+ order + "                ] grid_size_x="+str(x)+" grid_size_y="+str(y)+" tile_overlap="+str(overlap)+" first_file_index_i=1 directory=["+str(carpeta)+" ] file_names={i}."+str(ext)+" output_textfile_name=TileConfiguration.txt fusion_method=[Linear Blending] regression_threshold=0.10 xmax/avg_displacement_threshold=0.10 absolute_displacement_threshold=0.10 compute_overlap computation_parameters=[Save computation time (but use more RAM)] image_output=[Fuse and display]")
+       "type=[Grid: row-by-row] order=["+ order + "                ] grid_size_x="+str(x)+" grid_size_y="+str(y)+" tile_overlap="+str(overlap)+" first_file_index_i=1 directory=["+str(carpeta)+" ] file_names={i}."+str(ext)+" output_textfile_name=TileConfiguration.txt fusion_method=[Linear Blending] regression_threshold=0.10 xmax/avg_displacement_threshold=0.10 absolute_displacement_threshold=0.10 compute_overlap computation_parameters=[Save memory (but be slower)] image_output=[Fuse and display]")
 imp = IJ.getImage()
 IJ.saveAs(imp, "Jpeg", salida)
        # "type=[Grid: row-by-row] order=[Right & Down                ] grid_size_x="+str(x)+" grid_size_y="+str(y)+" tile_overlap="+str(overlap)+" first_file_index_i=1 directory=["+str(carpeta)+" ] file_names={i}."+str(ext)+" output_textfile_name=TileConfiguration.txt fusion_method=[Linear Blending] regression_threshold=0.30 xmax/avg_displacement_threshold=0.50 absolute_displacement_threshold=0.50 compute_overlap computation_parameters=[Save computation time (but use more RAM)] image_output=[Fuse and display]")
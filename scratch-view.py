@@ -12,18 +12,17 @@ __appid__ = 'com.infina.scratch-view.0.1'
 from pathlib import Path
 import platform
 import traceback
+import json
 import sys
 import os
 
-import matplotlib.pyplot as plt
-import pandas as pd
+# matplotlib y pandas tardan cientos de ms en importar: se cargan
+# recien cuando hacen falta (Plot.__init__ y CsvLoader.run) para que
+# la ventana aparezca antes. numpy queda eager porque QtImageViewer
+# ya lo importa igual
 import numpy as np
 
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg, NavigationToolbar2QT as NavigationToolbar
-from matplotlib.backend_tools import Cursors
-
-from PyQt6.QtCore import Qt, QPoint, QPointF, pyqtSignal, QSize, QProcess, QSettings
+from PyQt6.QtCore import Qt, QPoint, pyqtSignal, QSize, QObject, QProcess, QRunnable, QSettings, QThreadPool, QTimer
 from PyQt6.QtGui import QAction, QColor, QIcon, QImage, QPainter
 from PyQt6.QtWidgets import QToolBar, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFileDialog, QLabel, QMessageBox, QPushButton, QDialog, QRadioButton, QButtonGroup, QDialogButtonBox, QFormLayout, QLineEdit
 from QtImageViewer import QtImageViewer
@@ -37,6 +36,31 @@ except ImportError:
     pass
 
 
+# resultado del scan de carpetas de tiles, keyed por (path, mtime_ns)
+# para no repasar directorios grandes que no cambiaron
+_dirCache = {}
+
+
+def _scanDirectory(directory):
+    st = os.stat(directory)
+    key = (str(directory), st.st_mtime_ns)
+    cached = _dirCache.get(key)
+    if cached is not None:
+        return cached
+    # una sola pasada por el directorio, clasificando al vuelo
+    csvs, imgs = [], []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.endswith('.jpg'):
+                imgs.append(Path(entry.path))
+            elif entry.name.endswith('.csv'):
+                csvs.append(Path(entry.path))
+    csvs.sort()
+    imgs.sort()
+    _dirCache[key] = (csvs, imgs)
+    return csvs, imgs
+
+
 def errorDialog(parent, title, message):
     print(message)
     QMessageBox.critical(parent, str(title), message)
@@ -50,7 +74,8 @@ class MainWindow(QMainWindow):
             QIcon(os.path.join(basedir, "data", "scratch-view.ico")))
         self.setWindowTitle("Scratch View")
         self.viewer = QtImageViewer()
-        self.plot = Plot(self)
+        # el plot se construye en _initPlot, con la ventana ya visible
+        self.plot = None
         self.label = QLabel('')
         f = self.label.font()
         f.setPointSize(15)
@@ -62,8 +87,8 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout()
         layout.addWidget(self.label)
         layout.addWidget(self.viewer)
-        layout.addWidget(self.plot)
         widget.setLayout(layout)
+        self._centralLayout = layout
 
         self.setCentralWidget(widget)
 
@@ -78,11 +103,9 @@ class MainWindow(QMainWindow):
         self.viewer.setAcceptDrops(True)
 
         self.viewer.dropEvent = self.dropEvent
-        self.plot.dropEvent = self.dropEvent
 
         self.viewer.dragEnterEvent = self.dragEnterEvent
         self.viewer.dragMoveEvent = self.dragMoveEvent
-        self.plot.dragEnterEvent = self.dragEnterEvent
 
         self.p = None
 
@@ -90,6 +113,8 @@ class MainWindow(QMainWindow):
         self.dataFiletypes = ['.csv', '.tsv']
 
         self.filetypes = self.imgFiletypes + self.dataFiletypes
+        # lookup O(1) por sufijo para el filtrado de drag&drop
+        self._ftset = frozenset(self.filetypes)
 
         self.imgFileFilter = " ".join(["*" + s for s in self.imgFiletypes])
         self.dataFileFilter = " ".join(["*" + s for s in self.dataFiletypes])
@@ -101,10 +126,31 @@ class MainWindow(QMainWindow):
 
         self.zeroEllipse = None
 
+        # junta los mouseMoveEvent y actualiza la barra de estado a ~60Hz
+        self._posTimer = QTimer(self)
+        self._posTimer.setSingleShot(True)
+        self._posTimer.setInterval(16)
+        self._posTimer.timeout.connect(self._flushPos)
+        self._lastPoint = None
+        self._marcandoLinea = False
+
         self.lastDir = ""
         self.readSettings()
 
         self.show()
+        # con la ventana ya en pantalla, el proximo paso del event loop
+        # paga el import de matplotlib y arma el canvas
+        QTimer.singleShot(0, self._initPlot)
+
+    def _initPlot(self):
+        self.plot = Plot(self)
+        self._centralLayout.addWidget(self.plot)
+        self.plot.dropEvent = self.dropEvent
+        self.plot.dragEnterEvent = self.dragEnterEvent
+        self.plot.lineAdded.connect(
+            lambda: self.exportLinesAction.setDisabled(False))
+        self.plot.lineAdded.connect(
+            lambda: self.saveAsAction.setDisabled(False))
 
     def setScaleFromBtn(self, button):
         self.scaleCurrentName = button.text()
@@ -156,10 +202,6 @@ class MainWindow(QMainWindow):
         self.exportLinesAction = QAction("Exportar lineas", self)
         self.exportLinesAction.triggered.connect(self.exportLines)
         self.exportLinesAction.setDisabled(True)
-        self.plot.lineAdded.connect(
-            lambda: self.exportLinesAction.setDisabled(False))
-        self.plot.lineAdded.connect(
-            lambda: self.saveAsAction.setDisabled(False))
 
         self.newStitchAction = QAction("Juntar imagenes", self)
         self.newStitchAction.triggered.connect(self.juntarImagenes)
@@ -208,40 +250,52 @@ class MainWindow(QMainWindow):
                 return
             self.enableSetZeroAction.setChecked(False)
             self.viewer.viewport().setCursor(Qt.CursorShape.CrossCursor)
-            self.viewer.mousePositionOnImageChanged.connect(
-                self.plot.mostrarLinea)
+            # mostrarLinea corre desde _flushPos, acoplada al mismo
+            # timer de ~60Hz que la barra de estado
+            self._marcandoLinea = True
             self.viewer.drawROI = 'Line'
             self.viewer.rightMouseButtonReleased.connect(self.plot.marcarLinea)
         else:
             self.viewer.viewport().setCursor(Qt.CursorShape.ArrowCursor)
             self.viewer.rightMouseButtonReleased.disconnect(
                 self.plot.marcarLinea)
-            self.viewer.mousePositionOnImageChanged.disconnect(
-                self.plot.mostrarLinea)
+            self._marcandoLinea = False
             self.viewer.drawROI = None
 
     def setZero(self, x, y):
-        if self.zeroEllipse:
-            self.viewer.scene.removeItem(self.zeroEllipse)
         r = 25
-        self.zeroEllipse = self.viewer.scene.addEllipse(
-            x-r, y-r, 2*r, 2*r, pen=0, brush=QColor("#FFD141"))
-        self.zeroEllipsePos = QPointF(round(x-r), round(y-r))
+        if not self.zeroEllipse:
+            # el item se crea una sola vez centrado en su origen local,
+            # los clicks siguientes solo lo trasladan con setPos
+            self.zeroEllipse = self.viewer.scene.addEllipse(
+                -r, -r, 2*r, 2*r, pen=0, brush=QColor("#FFD141"))
+        self.zeroEllipse.setPos(x, y)
+        self._zx, self._zy = round(x-r), round(y-r)
 
         self.enableSetZeroAction.toggle()
         self.enableMarcarLineaAction.setDisabled(False)
 
     def printPos(self, point):
+        self._lastPoint = point
+        if not self._posTimer.isActive():
+            self._posTimer.start()
+
+    def _flushPos(self):
+        point = self._lastPoint
+        if point is None:
+            return
         if self.zeroEllipse:
             self.plot.x, y = self._mapToum(
-                QPointF(point) - self.zeroEllipsePos)
+                point.x() - self._zx, point.y() - self._zy)
             self.plot.fIn = self.plot.getfIn(self.plot.x)
             self.status.showMessage(
                 f"x={self.plot.x}, y={y}   F={self.plot.fIn:.2f}N")
+            if self._marcandoLinea:
+                self.plot.mostrarLinea(point)
 
-    def _mapToum(self, point):
-        x, y = point.x(), point.y()
-        return round(self.scaleCurrentValue * x), round(self.scaleCurrentValue * y)
+    def _mapToum(self, dx, dy):
+        s = self.scaleCurrentValue
+        return round(s * dx), round(s * dy)
 
     def setTitle(self, title):
         self.imgPath = Path(title)
@@ -267,11 +321,8 @@ class MainWindow(QMainWindow):
             directory = Path(directory).resolve()
 
             self.directory_juntadas = directory
-            self.files_juntadas = sorted(Path.iterdir(directory))
-            self.csv_juntadas = [
-                f for f in self.files_juntadas if f.name.endswith('csv')]
-            imgs = [
-                f for f in self.files_juntadas if f.name.endswith('jpg')]
+            csvs, imgs = _scanDirectory(directory)
+            self.csv_juntadas = csvs
 
             if imgs[0].stem != '1':
                 # TODO convertir los archivos a 1 2 3...
@@ -292,10 +343,22 @@ class MainWindow(QMainWindow):
             self.status.showMessage('Uniendo imagenes')
             self.p = QProcess()
             self.p.finished.connect(self.p_finished)
+            # fiji loguea el progreso mayormente por stderr: se mezclan
+            # los dos canales y se lee todo por stdout
+            self.p.setProcessChannelMode(
+                QProcess.ProcessChannelMode.MergedChannels)
+            # muestra el progreso de Fiji mientras une y codifica la imagen
+            self.p.readyReadStandardOutput.connect(self._p_progress)
 
             self.p.start(fiji, ["--headless", "--run", "stitch-macro.py",
                          f'{x=},{y=},{overlap=},directory="{str(directory)}",outpath="{self.outpath}"'])
 
+    def _p_progress(self):
+        lines = bytes(self.p.readAllStandardOutput()).decode(
+            errors='replace').strip().splitlines()
+        if lines:
+            self.status.showMessage(f'Uniendo imagenes: {lines[-1]}')
+
     def p_finished(self):
         self.status.showMessage(f'Imagen guardada en {self.outpath}')
         self.viewer.open(self.outpath)
@@ -323,9 +386,13 @@ class MainWindow(QMainWindow):
     def dragEnterEvent(self, event):
         """Acepta archivos si alguno tiene formato valido"""
         if (event.mimeData().hasFormat("text/uri-list")):
-            urls = event.mimeData().urls()
-            self.paths = [path for path in (
-                Path(url.path()) for url in urls) if path.suffix in self.filetypes]
+            paths = []
+            for url in event.mimeData().urls():
+                # toLocalFile maneja windows, donde path() da '/C:/...'
+                path = Path(url.toLocalFile() or url.path())
+                if path.suffix in self._ftset:
+                    paths.append(path)
+            self.paths = paths
             if self.paths:
                 event.accept()
 
@@ -350,7 +417,17 @@ class MainWindow(QMainWindow):
             "scaleCurrentName", 'olympus')
         self.scaleCurrentValue = float(
             self.settings.value("scaleCurrentValue", 0.44))
-        self.scales = self.settings.value("scales", self.scales)
+        # un solo string json en vez de un dict de QVariants anidados
+        raw = self.settings.value("scales", None)
+        if isinstance(raw, str):
+            try:
+                self.scales = json.loads(raw)
+            except json.JSONDecodeError:
+                # string corrupto o truncado: quedan las escalas default
+                pass
+        elif isinstance(raw, dict):
+            # formato viejo guardado como dict, se migra al guardar
+            self.scales = raw
 
     def saveSettings(self):
         self.settings.setValue("size", self.size())
@@ -359,7 +436,7 @@ class MainWindow(QMainWindow):
         self.settings.setValue("lastDir", self.lastDir)
         self.settings.setValue("scaleCurrentName", self.scaleCurrentName)
         self.settings.setValue("scaleCurrentValue", self.scaleCurrentValue)
-        self.settings.setValue("scales", self.scales)
+        self.settings.setValue("scales", json.dumps(self.scales))
 
     def showAbout(self):
         msgBox = QMessageBox(self)
@@ -506,10 +583,12 @@ class ScaleDialog(QDialog):
         # deshabilita el Ok si no estan los dos campos llenos
         ok = btnBox.buttons()[0]
         ok.setDisabled(True)
-        nombre.textChanged.connect(lambda: ok.setDisabled(
-            False) if valor.text() else None)
-        valor.textChanged.connect(lambda: ok.setDisabled(
-            False) if nombre.text() else None)
+
+        def validar():
+            ok.setDisabled(not (nombre.text() and valor.text()))
+
+        nombre.textChanged.connect(validar)
+        valor.textChanged.connect(validar)
 
         btnBox.accepted.connect(dialog.accept)
         btnBox.accepted.connect(self.enableTrashing)
@@ -523,6 +602,58 @@ class ScaleDialog(QDialog):
         dialog.open()
 
 
+class CsvLoaderSignals(QObject):
+    done = pyqtSignal(object, object, str, int)
+    failed = pyqtSignal(object, str)
+
+
+class CsvLoader(QRunnable):
+    """Parsea el csv en un thread del pool para no congelar la UI"""
+
+    # solo estas columnas se grafican y consultan
+    dtypes = {'x': np.float32, 'fIn': np.float32, 'fSet': np.float32}
+
+    def __init__(self, filepath, loadId):
+        super().__init__()
+        self.filepath = filepath
+        self.loadId = loadId
+        self.signals = CsvLoaderSignals()
+
+    def run(self):
+        try:
+            # import perezoso y ademas fuera del thread de la UI
+            import pandas as pd
+            # los parametros del ensayo estan en la primera fila
+            first = pd.read_csv(self.filepath, nrows=1)
+            params = dict(zip(("fin", "ffin", "largo", "vel",
+                               "Kp", "Ki", "Kd"), first.iloc[0].to_list()))
+            # cache columnar al lado del csv, valido si es mas nuevo
+            cache = self.filepath.with_suffix('.sv.parquet')
+            df = None
+            try:
+                if (cache.exists()
+                        and cache.stat().st_mtime >= self.filepath.stat().st_mtime):
+                    df = pd.read_parquet(cache)
+            except Exception:
+                df = None
+            if df is None:
+                try:
+                    df = pd.read_csv(self.filepath, usecols=list(self.dtypes),
+                                     dtype=self.dtypes, engine='pyarrow')
+                except (ImportError, ValueError):
+                    df = pd.read_csv(self.filepath, usecols=list(self.dtypes),
+                                     dtype=self.dtypes)
+                try:
+                    df.to_parquet(cache, compression='zstd')
+                except Exception:
+                    # carpeta de solo lectura o sin pyarrow: sin cache
+                    pass
+            self.signals.done.emit(
+                df, params, self.filepath.name, self.loadId)
+        except Exception as e:
+            self.signals.failed.emit(e, traceback.format_exc())
+
+
 class Plot(QWidget):
 
     # doubleClickAction = Signal(str)
@@ -544,8 +675,19 @@ class Plot(QWidget):
 
         super(Plot, self).__init__(parent)
 
+        # primer uso de matplotlib: los globals dejan los nombres
+        # disponibles para el resto de la clase
+        global plt, FigureCanvasQTAgg, NavigationToolbar, Cursors
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg, NavigationToolbar2QT as NavigationToolbar
+        from matplotlib.backend_tools import Cursors
+
         self.figure = plt.figure()
         self.figureCanvas = FigureCanvasQTAgg(self.figure)
+        # el canvas pinta todo su rectangulo, Qt no necesita limpiar el
+        # fondo antes de cada paintEvent
+        self.figureCanvas.setAttribute(
+            Qt.WidgetAttribute.WA_OpaquePaintEvent, True)
         self.navigationToolbar = NavigationToolbar(self.figureCanvas, self)
 
         layout = QVBoxLayout()
@@ -554,17 +696,36 @@ class Plot(QWidget):
         self.setLayout(layout)
 
         self.ax = self.figure.add_subplot(111)
+        # la reuso en cada plot() con set_data en vez de rehacer los artists
+        self._lineIn, = self.ax.plot([], [], "b")
+        self._lineSet, = self.ax.plot([], [], "--", color="gray")
+        # constrained layout reemplaza el tight_layout por llamada
+        self.figure.set_layout_engine('constrained')
+
+        # linea del cursor animada: queda fuera del draw normal y se
+        # blitea sobre el fondo cacheado en mostrarLinea
+        self.line = self.ax.axvline(
+            0, ls='-.', color="gray", animated=True, visible=False)
+        self._bg = None
+        self.figureCanvas.mpl_connect('draw_event', self._captureBg)
 
         self.figureCanvas.show()
 
         self.x = 0
         self.fIn = 0
-        self.line = None
+        self._loadId = 0
+
+        # columnas calientes del df como ndarrays planos, los llena ajustardf
+        self._um = np.array([])
+        self._fInArr = np.array([])
+        self._fSetArr = np.array([])
 
         # TODO leerlas de los metadatos
         self.lineasMarcadas = []
         self.lineasMarcadasX = []
-        self.lineasMarcadasXnp = np.array([])
+        # buffer con crecimiento amortizado, la parte viva es [:_xlen]
+        self._xbuf = np.empty(16, dtype=np.int32)
+        self._xlen = 0
         self.lines = []
 
         self.cursorOnLine = False
@@ -584,15 +745,27 @@ class Plot(QWidget):
 
     def open(self, filepath):
         """Open file picker to open csv """
-        try:
+        if not filepath:
+            filepath, _ = QFileDialog.getOpenFileName(
+                self, "Abrir csv", "", "Spreadsheet files (*.csv *.tsv *.xlx)")
             if not filepath:
-                filepath, _ = QFileDialog.getOpenFileName(
-                    self, "Abrir csv", "", "Spreadsheet files (*.csv *.tsv *.xlx)")
-                if not filepath:
-                    return
-                filepath = Path(filepath).resolve()
-            self.df = pd.read_csv(filepath)
-            title = filepath.name
+                return
+            filepath = Path(filepath).resolve()
+        # parsea en un thread para no bloquear la ventana; el id
+        # descarta resultados de aperturas viejas que terminen tarde
+        self._loadId += 1
+        loader = CsvLoader(filepath, self._loadId)
+        loader.signals.done.connect(self._csvLoaded)
+        loader.signals.failed.connect(
+            lambda e, tb: errorDialog(self, e, tb))
+        QThreadPool.globalInstance().start(loader)
+
+    def _csvLoaded(self, df, params, title, loadId):
+        if loadId != self._loadId:
+            return
+        try:
+            self.df = df
+            self.params = params
             self.ajustardf()
             self.plot(title)
         except Exception as e:
@@ -600,58 +773,102 @@ class Plot(QWidget):
 
     def ajustardf(self):
         df = self.df
-        params = {}
-        params["fin"], params["ffin"],  params["largo"], params["vel"], params["Kp"], params["Ki"], params["Kd"], * \
-            _ = df.iloc[0].to_list()
-        self.params = params
         # TODO setear escala bien
-        if df.x.mean() < -1:
-            df.x = - df.x
+        x = df['x'].to_numpy()
+        if x.mean() < -1:
+            # niega sobre el buffer del df, sin columna intermedia
+            np.negative(x, out=x)
         # saco el acercamiento y estabilizacion
-        l = len(df.x[df.x == 0.]) - 1
-        df = df.drop(df[:l].index).reset_index(drop=True)
-        df['um'] = df.x/25.6
-        df.fIn = df.fIn/1000
-        df.fSet = df.fSet/1000
+        l = np.count_nonzero(x == 0.) - 1
+        df = df.iloc[l:].reset_index(drop=True)
+        df['um'] = df['x'].to_numpy() * (1.0/25.6)
+        fIn = df['fIn'].to_numpy()
+        np.multiply(fIn, 1e-3, out=fIn)
+        fSet = df['fSet'].to_numpy()
+        np.multiply(fSet, 1e-3, out=fSet)
         self.df = df
+        # evita pasar por el indexing de pandas en printPos y plot;
+        # float32 contiguo alcanza y entra mejor en cache
+        self._um = np.ascontiguousarray(df.um.to_numpy(np.float32))
+        self._fInArr = np.ascontiguousarray(df.fIn.to_numpy(np.float32))
+        self._fSetArr = np.ascontiguousarray(df.fSet.to_numpy(np.float32))
+
+    def _decimate(self, x, y, target=4000):
+        """Reduce la traza a ~target puntos con min/max por bloque.
+        La pantalla tiene ~1000px de ancho asi que la envolvente dibujada
+        es identica, pero agg deja de trazar cada muestra"""
+        n = x.size
+        if n <= target:
+            return x, y
+        m = target // 2
+        stride = n // m
+        x2 = x[:stride * m].reshape(m, stride)
+        y2 = y[:stride * m].reshape(m, stride)
+        xd = np.repeat(x2[:, 0], 2)
+        yd = np.stack([y2.min(1), y2.max(1)], axis=1).ravel()
+        return xd, yd
 
     def plot(self, title):
-        self.ax.cla()
-        self.ax.plot(self.df.um, self.df.fIn, "b")
-        self.ax.plot(self.df.um, self.df.fSet, "--", color="gray")
+        # solo se decima lo que se dibuja, getfIn sigue usando los
+        # arrays completos
+        self._lineIn.set_data(*self._decimate(self._um, self._fInArr))
+        self._lineSet.set_data(*self._decimate(self._um, self._fSetArr))
+        self.ax.relim()
+        self.ax.autoscale_view()
         self.ax.set_xlabel(r"$\mathrm{Largo\ (\mu m)}$")
         self.ax.set_ylabel("Fuerza (N)")
         self.ax.set_title(title)
         self.figureCanvas.draw_idle()
-        self.figure.tight_layout()
 
     def getfIn(self, x):
-        try:
-            idx = np.searchsorted(self.df['um'], x, side='left')
-            return self.df.fIn[idx]
-        except (ValueError, KeyError):
-            return 0
+        idx = np.searchsorted(self._um, x, side='left')
+        if idx >= self._um.size:
+            return 0.0
+        return float(self._fInArr[idx])
+
+    @property
+    def lineasMarcadasXnp(self):
+        return self._xbuf[:self._xlen]
+
+    def _appendX(self, x):
+        if self._xlen == self._xbuf.size:
+            self._xbuf = np.resize(self._xbuf, 2 * self._xbuf.size)
+        self._xbuf[self._xlen] = x
+        self._xlen += 1
+
+    def _removeX(self, i):
+        # corre la cola un lugar para mantener el orden de self.lines
+        self._xbuf[i:self._xlen - 1] = self._xbuf[i + 1:self._xlen]
+        self._xlen -= 1
+
+    def _captureBg(self, event):
+        # el fondo se recaptura en cada draw completo (resize, re-plot,
+        # marcas nuevas), la linea animada no aparece en esos draws
+        self._bg = self.figureCanvas.copy_from_bbox(self.ax.bbox)
 
     def mostrarLinea(self, point):
         if point.x() > -1:
-            if not self.line:
-                self.line = self.ax.axvline(self.x, ls='-.', color="gray")
-            else:
-                self.line.set(xdata=[self.x, self.x], visible=True)
+            self.line.set(xdata=[self.x, self.x], visible=True)
         else:
-            if self.line:
-                self.line.set(visible=False)
-        self.figureCanvas.draw()
+            self.line.set(visible=False)
+        if self._bg is None:
+            self.figureCanvas.draw_idle()
+            return
+        # blitting: restaurar el fondo y redibujar solo la linea
+        self.figureCanvas.restore_region(self._bg)
+        self.ax.draw_artist(self.line)
+        self.figureCanvas.blit(self.ax.bbox)
 
     def marcarLinea(self, x, y):
-        if self.line is not None:
+        if self.line.get_visible():
             self.lineasMarcadas.append((self.x, self.fIn))
             self.lineasMarcadasX.append(self.x)
-            self.lineasMarcadasXnp = np.array(self.lineasMarcadasX)
-            self.line.set(ls=":", color="gray", alpha=0.5)
-            self.lines.append(self.line)
-            self.line = None
+            self._appendX(self.x)
+            marca = self.ax.axvline(self.x, ls=":", color="gray", alpha=0.5)
+            self.lines.append(marca)
             self.lineAdded.emit()
+            # deja la marca nueva en el fondo cacheado
+            self.figureCanvas.draw_idle()
 
     def mousePressEvent(self, event):
         if self.ax.get_navigate_mode() != None:
@@ -671,7 +888,7 @@ class Plot(QWidget):
         if self.cursorOnLine:
             self.lines.pop(self.closestLineIdx).remove()
             self.lineasMarcadasX.pop(self.closestLineIdx)
-            self.lineasMarcadasXnp = np.array(self.lineasMarcadasX)
+            self._removeX(self.closestLineIdx)
             self.figureCanvas.draw_idle()
             return
         # if self.pressed:
@@ -683,14 +900,20 @@ class Plot(QWidget):
     def mouseMoveEvent(self, event):
         if self.ax.get_navigate_mode() != None:
             return
-        if self.lineasMarcadasX:
-            if np.min(m := np.abs(event.x - self.lineasMarcadasXnp)) < 20:
-                self.closestLineIdx = np.argmin(m)
-                self.figureCanvas.set_cursor(Cursors.HAND)
-                self.cursorOnLine = True
-        elif self.cursorOnLine:
+        onLine = False
+        if self._xlen and event.xdata is not None:
+            # una sola pasada argmin y una sola lectura de distancia
+            d = np.abs(int(event.xdata) - self.lineasMarcadasXnp)
+            idx = int(np.argmin(d))
+            if d[idx] < 20:
+                self.closestLineIdx = idx
+                onLine = True
+        # cambia el cursor solo en las transiciones
+        if onLine and not self.cursorOnLine:
+            self.figureCanvas.set_cursor(Cursors.HAND)
+        elif not onLine and self.cursorOnLine:
             self.figureCanvas.set_cursor(Cursors.POINTER)
-            self.cursorOnLine = False
+        self.cursorOnLine = onLine
 
 
 if __name__ == '__main__':